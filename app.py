@@ -1,23 +1,95 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
+import logging
+import hashlib
 import json
+import orjson
 import pandas as pd
-from datetime import datetime, timedelta
+import time
 import re
+from itertools import islice
 
 # === Load .env variables ===
-LANGFLOW_TOKEN=st.secrets["general"]["LANGFLOW_TOKEN"]
+@st.cache_resource(show_spinner=False)
+def get_langflow_token():
+    """Read the Langflow token from st.secrets once per process (clear the resource cache after rotating it)"""
+    return st.secrets["general"]["LANGFLOW_TOKEN"]
+
+LANGFLOW_TOKEN = get_langflow_token()
+
+# Verbose request/response logging; off unless DEBUG is set in the environment
+logger = logging.getLogger(__name__)
+if os.getenv("DEBUG", "").lower() in ("1", "true", "yes"):
+    logging.basicConfig()
+    logger.setLevel(logging.DEBUG)
 
 # === Langflow API Configuration ===
 API_URL = "https://api.langflow.astra.datastax.com/lf/d2b3e98e-4aae-4715-8695-f50c9ae8cf50/api/v1/run/9aa1c11b-f102-42f5-8038-30fb504d4639"
 
+# === Shared HTTP session ===
+@st.cache_resource(show_spinner=False)
+def get_http_session():
+    """Return a keep-alive session shared across reruns so Langflow calls reuse pooled connections"""
+    session = requests.Session()
+    retry = Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504], raise_on_status=False)
+    session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=10, max_retries=retry))
+    session.headers.update({
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {get_langflow_token()}"
+    })
+    return session
+
+_SESSION = get_http_session()
+
 # Debug: Show API URL and LANGFLOW_TOKEN (partially masked)
 def mask_token(token):
     if not token or len(token) < 8:
         return "***"
     return token[:4] + "..." + token[-4:]
 
+# === Precompiled regex patterns ===
+# Single-pass line classifier for parse_paper_data. Branches are tried in
+# priority order at the start of the line (titles first, then fields); the lazy
+# `.*?` prefixes make the field branches behave like an unanchored search. The
+# branch name is read back from `lastgroup` and its value is the next group.
+# The numbered-title branches share one `\d+\.\s*` prefix so the digit scan runs
+# once per line and non-numbered lines are rejected on their first character.
+_LINE_RE = re.compile(
+    r'^(?:'
+    r'\d+\.\s*(?:'
+    r'(?P<title_label>(?i:\*\*Title\*\*:?\s*(.*)))'  # 1. **Title**: ...
+    r'|(?P<title_bold>\*\*(.*?)\*\*)'               # **Title**
+    r'|(?P<title_underline>__(.*?)__)'                 # __Title__
+    r'|(?P<title_italic>\*(.*?)\*)'                   # *Title*
+    r'|(?P<title_numbered>(.*?)$)'                     # fallback: numbered title
+    r')'
+    r'|(?P<title_plain>(?i:Title:?[ \t]*(.+)))'        # Title: ... (must have at least one character after colon)
+    r'|(?P<authors>(?i:.*?Authors?:?\s*(.*)))'
+    r'|(?P<published>.*?Published:?\s*([A-Za-z]+ \d{1,2}, \d{4}))'
+    r'|(?P<summary>(?i:.*?(?:Summary|Abstract):?\s*(.*)))'
+    r'|(?P<url>.*?(https?://arxiv\.org/[\w\-/\.]+))'
+    r')'
+)
+_TITLE_KINDS = frozenset(name for name in _LINE_RE.groupindex if name.startswith('title'))
+# The markdown-link patterns cap link text at 500 characters (and the URL at
+# 2000) so malformed LLM output cannot drive quadratic backtracking scans;
+# a link with longer text is left as raw markdown.
+_MD_LINK_RE = re.compile(r'\[(.{0,500}?)\]\([^\)]{1,2000}\)')
+_NUMBERED_RE = re.compile(r'^\d+\. ')
+# Markers of a structured response ('*' also covers '**')
+_MARKER_RE = re.compile(r'\*|•|- |Key findings:|Abstract:|Summary:')
+# Whole-title markdown link, text taken up to the first '](' (used by create_papers_dataframe)
+_MD_LINK_TITLE_RE = re.compile(r'^\[(.{0,500}?)\]\(.*\)$', re.DOTALL)
+
+# Characters trimmed from both ends of each field by format_structured_paper_list
+_TRIM = ':* \t\n\r'
+
+# Fields returned (as parallel lists) by parse_paper_data
+_PAPER_FIELDS = ('title', 'authors', 'published', 'summary', 'url', 'categories')
+
 def extract_structured_content(response_data):
     """Extract clean, structured content from API response"""
     try:
@@ -39,7 +111,7 @@ def extract_structured_content(response_data):
                     text_response = text_response.replace('\\n', '\n').replace('\\"', '"')
                     
                     # If it's a structured response, format it for better display
-                    if any(marker in text_response for marker in ['**', '*', '•', '- ', 'Key findings:', 'Abstract:', 'Summary:']):
+                    if _MARKER_RE.search(text_response) is not None:
                         return format_structured_response(text_response)
                     else:
                         return text_response
@@ -54,10 +126,9 @@ def format_structured_response(text):
     """Format structured responses for better readability"""
     # If it's a summary with bullet points, enhance the formatting
     if '**' in text and ('*' in text or '•' in text):
-        lines = text.split('\n')
         formatted_lines = []
         
-        for line in lines:
+        for line in text.splitlines():
             line = line.strip()
             if not line:
                 formatted_lines.append('')
@@ -78,115 +149,88 @@ def format_structured_response(text):
     
     return text
 
+def extract_markdown_link_text(s):
+    """If s is in the form [text](url), return text, else return s"""
+    s = s.strip()
+    # Most titles are not links; skip the regex unless s can possibly match
+    if not s or s[0] != '[' or '](' not in s:
+        return s
+    m = _MD_LINK_RE.match(s)
+    return m.group(1).strip() if m else s
+
 def parse_paper_data(text_response):
-    """Parse the response text and extract paper information, supporting both markdown and plain text field labels, and extracting the title from markdown links if present."""
-    papers = []
-    lines = text_response.split('\n')
-    current_paper = {}
-
-    # Patterns for different markdown title styles and plain text
-    title_patterns = [
-        re.compile(r'^\d+\.\s*\*\*Title\*\*:?\s*(.*)', re.IGNORECASE), # 1. **Title**: ...
-        re.compile(r'^\d+\.\s*\*\*(.*?)\*\*'),   # **Title**
-        re.compile(r'^\d+\.\s*__(.*?)__'),           # __Title__
-        re.compile(r'^\d+\.\s*\*(.*?)\*'),         # *Title*
-        re.compile(r'^\d+\.\s*(.*?)$'),              # fallback: numbered title
-        re.compile(r'^Title:?[ \t]*(.+)', re.IGNORECASE), # Title: ... (must have at least one character after colon)
-    ]
-
-    def extract_markdown_link_text(s):
-        # If s is in the form [text](url), return text, else return s
-        m = re.match(r'\[(.*?)\]\([^\)]+\)', s)
-        return m.group(1).strip() if m else s.strip()
-
-    for line in lines:
+    """Parse the response text and extract paper information, supporting both markdown and plain text field labels, and extracting the title from markdown links if present.
+
+    Papers are returned column-wise: a dict mapping each field in _PAPER_FIELDS to a list with one entry per paper.
+    """
+    papers = {field: [] for field in _PAPER_FIELDS}
+    titles = papers['title']
+    columns = tuple(papers.values())
+    current_idx = -1
+
+    # Bind hot-loop lookups to locals once, outside the per-line loop
+    line_match = _LINE_RE.match
+    extract_link = extract_markdown_link_text
+
+    def start_paper(title):
+        for column in columns:
+            column.append('')
+        titles[-1] = title
+        return len(titles) - 1
+
+    for line in text_response.splitlines():
         line = line.strip()
         if not line:
             continue
 
-        # Look for paper titles (various markdown styles and plain text)
-        matched = False
-        for pat in title_patterns:
-            m = pat.match(line)
-            if m:
-                # Save previous paper if exists
-                if current_paper:
-                    papers.append(current_paper)
-                title_val = m.group(1).strip() if m.group(1) else ''
-                title_val = extract_markdown_link_text(title_val)
-                current_paper = {
-                    'title': title_val if title_val else 'Unknown Title',
-                    'categories': '',
-                    'url': '',
-                    'summary': '',
-                    'authors': '',
-                    'published': ''
-                }
-                matched = True
-                break
-        if matched:
-            continue
-
-        # Look for authors (plain or markdown)
-        authors_match = re.search(r'Authors?:?\s*(.*)', line, re.IGNORECASE)
-        if authors_match and current_paper is not None:
-            val = authors_match.group(1).strip().lstrip(':').lstrip('*').strip()
-            current_paper['authors'] = val
-            continue
-
-        # Look for published date
-        published_match = re.search(r'Published:?\s*([A-Za-z]+ \d{1,2}, \d{4})', line)
-        if published_match and current_paper is not None:
-            val = published_match.group(1).strip().lstrip(':').lstrip('*').strip()
-            current_paper['published'] = val
+        m = line_match(line)
+        if not m:
             continue
+        kind = m.lastgroup
+        val = m.group(m.lastindex + 1)
 
-        # Look for summary (plain or markdown)
-        summary_match = re.search(r'(Summary|Abstract):?\s*(.*)', line, re.IGNORECASE)
-        if summary_match and current_paper is not None:
-            val = summary_match.group(2).strip().lstrip(':').lstrip('*').strip()
-            current_paper['summary'] = val
-            continue
-
-        # Look for URLs (arxiv links)
-        url_match = re.search(r'(https?://arxiv\.org/[\w\-/\.]+)', line)
-        if url_match and current_paper is not None:
-            current_paper['url'] = url_match.group(1)
-            continue
-
-    # Add the last paper
-    if current_paper:
-        papers.append(current_paper)
+        # Look for paper titles (various markdown styles and plain text)
+        if kind in _TITLE_KINDS:
+            title_val = extract_link(val) if val else ''
+            current_idx = start_paper(title_val if title_val else 'Unknown Title')
+        # Authors, published date, summary or arxiv URL
+        else:
+            # Fields seen before any title still form a paper, with no title (None)
+            if current_idx < 0:
+                current_idx = start_paper(None)
+            papers[kind][current_idx] = val.strip().lstrip(':').lstrip('*').strip()
 
     return papers
 
 def format_structured_paper_list(papers):
     """Format a list of papers in a structured, readable way with clear fields and dividers, each field on its own line and no stray asterisks."""
-    if not papers:
+    if not papers or not papers['title']:
         return "No papers found in the expected format."
     output = []
-    for paper in papers:
+    for title, authors, published, summary, url in zip(
+        papers['title'], papers['authors'], papers['published'], papers['summary'], papers['url']
+    ):
         # Title as plain text with label, followed by a blank line
-        title_val = paper.get('title', 'Unknown Title').strip(':').strip('*').strip()
+        title_val = (title or 'Unknown Title').strip(_TRIM)
         output.append(f"**Title:** {title_val}")
         output.append("")
         # Authors
-        authors_val = paper.get('authors', '').strip(':').strip('*').strip()
+        authors_val = authors.strip(_TRIM)
         if authors_val:
             output.append(f"**Authors:** {authors_val}")
             output.append("")
         # Published date
-        published_val = paper.get('published', '').strip(':').strip('*').strip()
+        published_val = published.strip(_TRIM)
         if published_val:
             output.append(f"**Published:** {published_val}")
             output.append("")
         # Summary
-        summary_val = paper.get('summary', '').strip(':').strip('*').strip()
+        summary_val = summary.strip(_TRIM)
         if summary_val:
             output.append(f"**Summary:** {summary_val}")
             output.append("")
         # PDF Link
-        url_val = paper.get('url', '').strip()
+        url_val = url.strip()
         if url_val:
             output.append(f"**PDF Link:** {url_val}")
             output.append("")
@@ -196,115 +240,168 @@ def format_structured_paper_list(papers):
 
 def format_paper_display(papers, max_papers=3):
     """Format papers for better display"""
-    if not papers:
+    if not papers or not papers['title']:
         return "No papers found in the expected format."
     
-    formatted_output = f"## 📄 Found {min(len(papers), max_papers)} Recent Papers\n\n"
+    parts = [f"## 📄 Found {min(len(papers['title']), max_papers)} Recent Papers\n\n"]
     
-    for i, paper in enumerate(papers[:max_papers]):
-        formatted_output += f"### {i+1}. {paper.get('title', 'Unknown Title')}\n"
+    rows = zip(papers['title'], papers['categories'], papers['url'], papers['summary'])
+    for i, (title, categories, url, summary) in enumerate(islice(rows, max_papers)):
+        parts.append(f"### {i+1}. {title or 'Unknown Title'}\n")
         
-        if paper.get('categories'):
-            formatted_output += f"**Categories:** `{paper['categories']}`\n\n"
+        if categories:
+            parts.append(f"**Categories:** `{categories}`\n\n")
         
-        if paper.get('url'):
-            formatted_output += f"**Link:** [{paper['url']}]({paper['url']})\n\n"
+        if url:
+            parts.append(f"**Link:** [{url}]({url})\n\n")
         
-        if paper.get('summary'):
-            formatted_output += f"**Summary:** {paper['summary']}\n\n"
+        if summary:
+            parts.append(f"**Summary:** {summary}\n\n")
         
-        formatted_output += "---\n\n"
+        parts.append("---\n\n")
     
-    return formatted_output
+    return ''.join(parts)
 
 def create_papers_dataframe(papers):
     """Create a DataFrame from papers data (Title as plain text, URL as arxiv link, no Categories column)"""
-    if not papers:
+    if not papers or not papers['title']:
         return None
-    df_data = []
-    for paper in papers:
-        # If title is in markdown link format, extract only the text
-        title = paper.get('title', 'Unknown')
-        # Remove markdown link if present
-        if title.startswith('[') and '](' in title and title.endswith(')'):
-            title = title[1:title.index('](')]
-        # If title is the literal word 'Title', skip or set as Unknown
-        if title.strip().lower() == 'title':
-            title = 'Unknown Title'
-        df_data.append({
-            'Title': title,
-            'URL': paper.get('url', 'N/A')
-        })
-    return pd.DataFrame(df_data)
-
-def is_paper_list_response(response_text):
-    """Return True if the response looks like a paper list (at least 2 parsed papers or starts with numbered titles)."""
-    papers = parse_paper_data(response_text)
-    if len(papers) >= 2:
+    df = pd.DataFrame({'Title': papers['title'], 'URL': papers['url']})
+    titles = df['Title'].fillna('').replace('', 'Unknown')
+    # If title is in markdown link format, extract only the text
+    extracted = titles.str.extract(_MD_LINK_TITLE_RE, expand=False)
+    titles = extracted.where(extracted.notna(), titles)
+    # If title is the literal word 'Title', set as Unknown
+    titles = titles.mask(titles.str.strip().str.lower() == 'title', 'Unknown Title')
+    df['Title'] = titles
+    return df
+
+def is_paper_list_response(papers, response_text):
+    """Return True if the response looks like a paper list (at least 2 parsed papers or starts with numbered titles).
+
+    `papers` is the result of parse_paper_data(response_text), so the text is not parsed a second time.
+    """
+    if len(papers['title']) >= 2:
         return True
     # Also check if the response starts with a numbered list
-    lines = response_text.strip().split('\n')
-    numbered_lines = [line for line in lines if re.match(r'^\d+\. ', line)]
-    return len(numbered_lines) >= 2
+    numbered_lines = 0
+    for line in response_text.strip().splitlines():
+        if _NUMBERED_RE.match(line):
+            numbered_lines += 1
+            if numbered_lines >= 2:
+                return True
+    return False
+
+# === Cached wrappers (messages never change once added, so these are pure) ===
+@st.cache_data(max_entries=1024)
+def _parse_paper_data_cached(text_response):
+    return parse_paper_data(text_response)
+
+@st.cache_data(max_entries=1024)
+def _make_papers_df_cached(papers):
+    return create_papers_dataframe(papers)
+
+@st.cache_data(max_entries=1024)
+def _papers_csv_cached(df):
+    return df.to_csv(index=False)
 
 # === Function to call Langflow ===
-def query_langflow(user_input):
-    """Query Langflow API"""
-    # Debug: Print and display API URL and LANGFLOW_TOKEN
-    print(f"[DEBUG] API_URL: {API_URL}")
-    print(f"[DEBUG] LANGFLOW_TOKEN: {mask_token(LANGFLOW_TOKEN)}")
-    st.sidebar.markdown(f"**[DEBUG] API_URL:** `{API_URL}`")
-    st.sidebar.markdown(f"**[DEBUG] LANGFLOW_TOKEN:** `{mask_token(LANGFLOW_TOKEN)}`")
-    
+def _fetch_langflow(user_input):
+    """POST the query to Langflow and return the decoded JSON response (raises on HTTP errors)"""
     payload = {
         "input_value": user_input,
         "output_type": "chat",
         "input_type": "chat"
     }
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {LANGFLOW_TOKEN}"
-    }
-
     # Debug: Show request details
-    print(f"API URL: {API_URL}")
-    print(f"Headers: {headers}")
-    print(f"Payload: {payload}")
+    logger.debug("API URL: %s", API_URL)
+    if logger.isEnabledFor(logging.DEBUG):
+        # The session carries the bearer token; never log it in full
+        headers = dict(_SESSION.headers)
+        headers["Authorization"] = f"Bearer {mask_token(LANGFLOW_TOKEN)}"
+        logger.debug("Headers: %s", headers)
+    logger.debug("Payload: %s", payload)
+
+    response = _SESSION.post(API_URL, json=payload, timeout=120)
+    
+    logger.debug("Response Status Code: %s", response.status_code)
+    logger.debug("Response Headers: %s", response.headers)
+    # response.text decodes the whole body, so only touch it when it will be logged
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Raw Response: %s", response.text)
+    
+    response.raise_for_status()
+    
+    # orjson decodes straight from the raw bytes, skipping the text decode step
+    response_data = orjson.loads(response.content)
+    
+    # Debug: Show raw response
+    logger.debug("Parsed Response Data: %s", response_data)
+    
+    return response_data
+
+@st.cache_data(show_spinner=False, ttl=3600, max_entries=256)
+def _cached_fetch_langflow(user_input, key_hash, history_hash):
+    """Cached wrapper around _fetch_langflow.
+
+    The cache is global across all user sessions. key_hash only partitions
+    entries per token so the raw token is never used as a cache key.
+    history_hash covers the earlier messages of the conversation, so a
+    follow-up question is only answered from cache after the same
+    conversation. Failed requests raise and are therefore never cached.
+    """
+    return _fetch_langflow(user_input)
+
+def _hash_token(token):
+    return hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+
+def _hash_history(history):
+    digest = hashlib.blake2b(digest_size=16)
+    for message in history:
+        digest.update(f"{message['role']}\0{message['content']}\0".encode())
+    return digest.hexdigest()
+
+def query_langflow(user_input, history=()):
+    """Query Langflow API; `history` is the list of messages that came before user_input"""
+    # Debug: Print and display API URL and LANGFLOW_TOKEN
+    logger.debug("API_URL: %s", API_URL)
+    logger.debug("LANGFLOW_TOKEN: %s", mask_token(LANGFLOW_TOKEN))
+    st.sidebar.markdown(f"**[DEBUG] API_URL:** `{API_URL}`")
+    st.sidebar.markdown(f"**[DEBUG] LANGFLOW_TOKEN:** `{mask_token(LANGFLOW_TOKEN)}`")
 
     try:
-        response = requests.post(API_URL, json=payload, headers=headers, timeout=120)
-        
-        print(f"Response Status Code: {response.status_code}")
-        print(f"Response Headers: {response.headers}")
-        print(f"Raw Response: {response.text}")
-        
-        response.raise_for_status()
-        
-        response_data = response.json()
-        
-        # Debug: Show raw response
-        print(f"Parsed Response Data: {response_data}")
+        # Without a token there is nothing to partition the cache by, so bypass it
+        if LANGFLOW_TOKEN:
+            response_data = _cached_fetch_langflow(
+                user_input, _hash_token(LANGFLOW_TOKEN), _hash_history(history)
+            )
+        else:
+            response_data = _fetch_langflow(user_input)
         
         # Extract the structured content
         clean_response = extract_structured_content(response_data)
-        print(f"Extracted Clean Response: {clean_response}")
+        logger.debug("Extracted Clean Response: %s", clean_response)
         
         return clean_response
         
     except requests.exceptions.HTTPError as e:
-        if response.status_code == 504:
+        status_code = e.response.status_code
+        if status_code == 504:
             return "❌ Error: Gateway Timeout. The request took too long. Try a simpler query."
-        elif response.status_code == 401:
+        elif status_code == 401:
             return "❌ Error: Authentication failed. Please check your LANGFLOW_TOKEN."
-        elif response.status_code == 404:
+        elif status_code == 404:
             return "❌ Error: Flow not found. Please check your API URL."
         else:
-            return f"❌ HTTP error {response.status_code}: {e}"
+            return f"❌ HTTP error {status_code}: {e}"
     except requests.exceptions.Timeout:
         return "❌ Error: The request timed out. Try a simpler query."
     except requests.exceptions.RequestException as e:
         return f"❌ Request error: {e}"
+    except orjson.JSONDecodeError as e:
+        # Non-JSON body; response.json() used to report this as a request error
+        return f"❌ Request error: {e}"
     except Exception as e:
         return f"❌ Unexpected error: {e}"
 
@@ -342,27 +439,34 @@ if "messages" not in st.session_state:
     st.session_state.messages = []
 
 # === Display chat history ===
-chat_container = st.container()
-
-with chat_container:
+@st.fragment
+def render_history():
+    """Render the stored chat messages.
+
+    The history has no widgets and the app has no other fragments yet, so this
+    still re-runs on every full rerun. st.fragment is a placeholder for future
+    fragment-scoped widgets, whose reruns will then skip the history.
+    """
     for message in st.session_state.messages:
         if message["role"] == "user":
             with st.chat_message("user"):
                 st.write(message['content'])
         else:
             with st.chat_message("assistant"):
-                content = message['content']
-                if is_paper_list_response(content):
-                    papers = parse_paper_data(content)
-                    if papers:
-                        st.markdown(format_structured_paper_list(papers))
-                        df = create_papers_dataframe(papers)
-                        if df is not None:
-                            st.dataframe(df, use_container_width=True)
-                    else:
-                        st.markdown(content)
+                # Papers are parsed once when the message is added, so reruns do no parsing
+                papers = message.get('papers')
+                if papers:
+                    st.markdown(format_structured_paper_list(papers))
+                    df = _make_papers_df_cached(papers)
+                    if df is not None:
+                        st.dataframe(df, use_container_width=True)
                 else:
-                    st.markdown(content)
+                    st.markdown(message['content'])
+
+chat_container = st.container()
+
+with chat_container:
+    render_history()
 
 # === Input section ===
 st.markdown("---")
@@ -375,23 +479,22 @@ if user_input and user_input.strip():
         st.write(user_input)
     with st.chat_message("assistant"):
         with st.spinner("🔍 Searching ArXiv and processing..."):
-            response = query_langflow(user_input)
-        if is_paper_list_response(response):
-            papers = parse_paper_data(response)
-            if papers:
-                st.markdown(format_structured_paper_list(papers))
-                df = create_papers_dataframe(papers)
-                if df is not None:
-                    st.dataframe(df, use_container_width=True)
-                    csv = df.to_csv(index=False)
-                    st.download_button(
-                        label="📥 Download as CSV",
-                        data=csv,
-                        file_name=f"arxiv_papers_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                        mime="text/csv"
-                    )
-            else:
-                st.markdown(response)
+            response = query_langflow(user_input, st.session_state.messages[:-1])
+        papers = _parse_paper_data_cached(response)
+        if not (papers['title'] and is_paper_list_response(papers, response)):
+            papers = None
+        if papers:
+            st.markdown(format_structured_paper_list(papers))
+            df = _make_papers_df_cached(papers)
+            if df is not None:
+                st.dataframe(df, use_container_width=True)
+                csv = _papers_csv_cached(df)
+                st.download_button(
+                    label="📥 Download as CSV",
+                    data=csv,
+                    file_name=f"arxiv_papers_{time.strftime('%Y%m%d_%H%M%S')}.csv",
+                    mime="text/csv"
+                )
         else:
             st.markdown(response)
-        st.session_state.messages.append({"role": "assistant", "content": response})
+        st.session_state.messages.append({"role": "assistant", "content": response, "papers": papers})